@@ -1,4 +1,6 @@
-from functools import lru_cache
+from functools import cached_property, lru_cache
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -7,21 +9,37 @@ class Settings(BaseSettings):
 
     # HMAC Secret for webhook signature validation
     hmac_secret: str = "dev-secret-key"
+    signature_algorithm: Literal["hmac-sha256", "blake3"] = "hmac-sha256"
 
     # MongoDB
     mongodb_uri: str = "mongodb://localhost:27017"
     mongodb_database: str = "webhook_system"
+    mongodb_max_pool_size: int = 50
+    mongodb_min_pool_size: int = 5
 
     # Redis
     redis_url: str = "redis://localhost:6379"
+    redis_max_connections: int = 50
+    redis_pool_timeout: float = 5.0
 
     # Downstream service
     downstream_url: str = "http://localhost:8001"
+    httpx_max_connections: int = 100
+    httpx_max_keepalive: int = 50
+    httpx_http2: bool = True
 
     # Application settings
     log_level: str = "INFO"
     worker_poll_interval: float = 1.0
     max_retry_attempts: int = 5
+    worker_batch_size: int = 50
+    delivery_concurrency: int = 32
+    # Minimum; the worker raises it to cover a full batch of timed-out deliveries
+    claim_lease_seconds: float = 60.0
+    pending_reconcile_interval: float = 30.0
+    mongo_sweep_interval: float = 30.0
+    # Due-queue batches drained per tick before the sweep and reconcile get a turn
+    due_queue_max_batches: int = 10
 
     # Retry backoff settings (in seconds)
     retry_base_delay: float = 1.0
@@ -32,6 +50,11 @@ class Settings(BaseSettings):
         env_file_encoding="utf-8",
     )
 
+    @cached_property
+    def hmac_secret_bytes(self) -> bytes:
+        """HMAC secret encoded once for the signature hot path."""
+        return self.hmac_secret.encode("utf-8")
+
 
 @lru_cache
 def get_settings() -> Settings:
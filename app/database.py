@@ -2,11 +2,15 @@
 Database connections for MongoDB and Redis.
 """
 
+from contextlib import suppress
+
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from redis.asyncio import Redis
+from pymongo.errors import OperationFailure
+from redis.asyncio import BlockingConnectionPool, Redis
 from typing import Optional
 
 from app.config import get_settings
+from app.models.webhook import WebhookStatus
 
 
 class Database:
@@ -22,17 +26,52 @@ class Database:
         settings = get_settings()
 
         # MongoDB connection
-        cls.client = AsyncIOMotorClient(settings.mongodb_uri)
+        cls.client = AsyncIOMotorClient(
+            settings.mongodb_uri,
+            maxPoolSize=settings.mongodb_max_pool_size,
+            minPoolSize=settings.mongodb_min_pool_size,
+        )
         cls.db = cls.client[settings.mongodb_database]
 
         # Create indexes for webhooks collection
         await cls.db.webhooks.create_index("status")
         await cls.db.webhooks.create_index("received_at")
         await cls.db.webhooks.create_index("event_type")
-        await cls.db.webhooks.create_index([("status", 1), ("next_retry_at", 1)])
 
-        # Redis connection
-        cls.redis = Redis.from_url(settings.redis_url, decode_responses=True)
+        # Partial index over live events only; includes _id so the worker's
+        # candidate lookup is answered from the index alone
+        await cls.db.webhooks.create_index(
+            [("status", 1), ("next_retry_at", 1), ("_id", 1)],
+            name="pending_claim",
+            partialFilterExpression={
+                "status": {
+                    "$in": [
+                        WebhookStatus.RECEIVED.value,
+                        WebhookStatus.PROCESSING.value,
+                    ]
+                }
+            },
+        )
+        with suppress(OperationFailure):
+            # Superseded by the partial pending_claim index
+            await cls.db.webhooks.drop_index("status_1_next_retry_at_1")
+        await cls.db.webhooks.create_index("claim_token")
+        await cls.db.webhooks.create_index(
+            "idempotency_key",
+            unique=True,
+            partialFilterExpression={"idempotency_key": {"$type": "string"}},
+        )
+
+        # Redis connection; the blocking pool waits for a free connection
+        # when the cap is reached instead of raising MaxConnectionsError
+        cls.redis = Redis.from_pool(
+            BlockingConnectionPool.from_url(
+                settings.redis_url,
+                decode_responses=True,
+                max_connections=settings.redis_max_connections,
+                timeout=settings.redis_pool_timeout,
+            )
+        )
 
     @classmethod
     async def disconnect(cls) -> None:
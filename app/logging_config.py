@@ -3,16 +3,31 @@ Simple logging configuration using Python's standard logging.
 """
 
 import logging
+import logging.handlers
+import queue
 import sys
-from typing import Any
+from typing import Any, Optional
 
 from app.config import get_settings
 
+# Background thread writing queued log records to stdout
+_listener: Optional[logging.handlers.QueueListener] = None
+
 
 def setup_logging() -> None:
-    """Configure basic logging."""
+    """
+    Configure basic logging.
+
+    Records are handed to a QueueHandler and written to stdout by a
+    QueueListener thread, so slow stdout (e.g. a piped log collector) never
+    blocks the event loop.
+    """
+    global _listener
     settings = get_settings()
 
+    if _listener is not None:
+        _listener.stop()
+
     # Configure root logger
     handler = logging.StreamHandler(sys.stdout)
     formatter = logging.Formatter(
@@ -21,8 +36,14 @@ def setup_logging() -> None:
     )
     handler.setFormatter(formatter)
 
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, handler, respect_handler_level=True
+    )
+    _listener.start()
+
     root_logger = logging.getLogger()
-    root_logger.handlers = [handler]
+    root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
     root_logger.setLevel(getattr(logging, settings.log_level.upper()))
 
     # Reduce noise from third-party libraries
@@ -30,6 +51,21 @@ def setup_logging() -> None:
     logging.getLogger("httpx").setLevel(logging.WARNING)
 
 
+def shutdown_logging() -> None:
+    """
+    Flush queued log records and stop the listener thread.
+
+    The root logger writes to the listener's handlers directly afterwards,
+    so later records (e.g. a second lifespan in the same process) are not
+    left in a queue nobody drains.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger().handlers = list(_listener.handlers)
+        _listener = None
+
+
 def get_logger(name: str) -> logging.Logger:
     """Get a logger instance."""
     return logging.getLogger(name)
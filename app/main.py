@@ -1,3 +1,5 @@
+import asyncio
+import uuid
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
@@ -8,9 +10,10 @@ from starlette.responses import Response
 
 from app.config import get_settings
 from app.database import Database
-from app.logging_config import setup_logging, get_logger
+from app.logging_config import setup_logging, shutdown_logging, get_logger
 from app.routes.webhooks import router as webhooks_router
 from app.services.delivery_worker import delivery_worker
+from app.services.hmac_validator import check_hash_backend, check_signature_algorithm
 
 
 setup_logging()
@@ -23,7 +26,16 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     settings = get_settings()
 
     # Startup
-    logger.info("application_starting, log_level=%s", settings.log_level)
+    logger.info(
+        "application_starting, log_level=%s, event_loop=%s",
+        settings.log_level,
+        type(asyncio.get_running_loop()).__module__,
+    )
+
+    # Fail startup rather than every ingest on a misconfigured algorithm
+    check_signature_algorithm()
+    if settings.signature_algorithm == "hmac-sha256":
+        check_hash_backend()
 
     await Database.connect()
     logger.info("database_connected")
@@ -40,6 +52,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     await Database.disconnect()
 
     logger.info("application_stopped")
+    shutdown_logging()
 
 
 # Create FastAPI application
@@ -55,9 +68,7 @@ app = FastAPI(
 @app.middleware("http")
 async def add_request_id(request: Request, call_next):
     """Add request ID to all requests for correlation."""
-    import uuid
-
-    request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
 
     response = await call_next(request)
     response.headers["X-Request-ID"] = request_id
@@ -94,7 +105,7 @@ async def metrics() -> Response:
 async def global_exception_handler(request: Request, exc: Exception) -> JSONResponse:
     """Global exception handler."""
     logger.error(
-        "unzhandled_exception: error=%s, path=%s",
+        "unhandled_exception: error=%s, path=%s",
         str(exc),
         request.url.path,
     )
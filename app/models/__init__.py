@@ -4,7 +4,9 @@ from app.models.webhook import (
     WebhookStatus,
     DeliveryAttempt,
     WebhookEvent,
+    WebhookEventInternal,
     IngestResponse,
+    SearchDate,
     SearchRequest,
     SearchResponse,
     Aggregations,
@@ -14,7 +16,9 @@ __all__ = [
     "WebhookStatus",
     "DeliveryAttempt",
     "WebhookEvent",
+    "WebhookEventInternal",
     "IngestResponse",
+    "SearchDate",
     "SearchRequest",
     "SearchResponse",
     "Aggregations",
@@ -1,8 +1,10 @@
 from datetime import datetime, timezone
 from enum import Enum
-from typing import Any, Optional
+from typing import Annotated, Any, Optional
+
+import msgspec
 from pydantic import BaseModel, Field, ConfigDict
-from bson import ObjectId
+from bson import Binary, ObjectId
 
 
 class WebhookStatus(str, Enum):
@@ -20,13 +22,27 @@ class DeliveryAttempt(BaseModel):
     error_message: Optional[str] = None
     duration_ms: Optional[float] = None
 
+    def to_mongo(self) -> dict:
+        # Built by hand: model_dump is measurable overhead on every delivery update
+        return {
+            "timestamp": self.timestamp,
+            "attempt_number": self.attempt_number,
+            "status_code": self.status_code,
+            "success": self.success,
+            "error_message": self.error_message,
+            "duration_ms": self.duration_ms,
+        }
+
 
 class WebhookEvent(BaseModel):
     id: Optional[str] = Field(default=None, alias="_id")
     payload: dict[str, Any]
+    # Original request body, stored for delivery but never returned by the API
+    payload_raw: Optional[bytes] = Field(default=None, exclude=True)
     status: WebhookStatus = WebhookStatus.RECEIVED
     received_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     event_type: Optional[str] = None
+    idempotency_key: Optional[str] = None
     delivery_attempts: list[DeliveryAttempt] = Field(default_factory=list)
     version: int = 1
     next_retry_at: Optional[datetime] = None
@@ -40,6 +56,8 @@ class WebhookEvent(BaseModel):
 
     def to_mongo(self) -> dict:
         data = self.model_dump(by_alias=True, exclude={"id"})
+        if self.payload_raw is not None:
+            data["payload_raw"] = Binary(self.payload_raw)
         return data
 
     @classmethod
@@ -49,6 +67,30 @@ class WebhookEvent(BaseModel):
         return cls(**doc)
 
 
+class WebhookEventInternal(msgspec.Struct, kw_only=True):
+    """
+    Delivery worker's view of a webhook event.
+
+    Decoded from MongoDB documents with msgspec instead of Pydantic: the worker
+    only reads documents it wrote itself, so per-field validation is wasted work.
+    Unknown document fields are ignored.
+    """
+
+    # Kept as an ObjectId: it is only used to address MongoDB updates
+    id: ObjectId = msgspec.field(name="_id")
+    # Not loaded by worker claims, which deliver payload_raw
+    payload: Optional[dict[str, Any]] = None
+    payload_raw: Optional[bytes] = None
+    status: WebhookStatus = WebhookStatus.RECEIVED
+    event_type: Optional[str] = None
+    delivery_attempts: list[dict[str, Any]] = msgspec.field(default_factory=list)
+    version: int = 1
+
+    @classmethod
+    def from_mongo(cls, doc: dict) -> "WebhookEventInternal":
+        return msgspec.convert(doc, cls)
+
+
 class IngestRequest(BaseModel):
     pass
 
@@ -59,14 +101,62 @@ class IngestResponse(BaseModel):
     message: str = "Webhook received successfully"
 
 
-class SearchRequest(BaseModel):
+class SearchDate(datetime):
+    """
+    Search filter datetime, decoded as leniently as Pydantic did.
+
+    Accepts ISO 8601 datetimes, YYYY-MM-DD dates (midnight) and Unix
+    timestamps in seconds or milliseconds, as numbers or numeric strings.
+    """
+
+    @classmethod
+    def parse(cls, value: Any) -> "SearchDate":
+        if isinstance(value, str):
+            try:
+                return cls.fromisoformat(value)
+            except ValueError:
+                try:
+                    value = float(value)
+                except ValueError:
+                    raise ValueError(f"Invalid datetime {value!r}") from None
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            # Like Pydantic, read values beyond 2e10 as milliseconds
+            if abs(value) > 2e10:
+                value /= 1000
+            try:
+                return cls.fromtimestamp(value, tz=timezone.utc)
+            except (OverflowError, OSError):
+                raise ValueError(f"Timestamp {value!r} out of range") from None
+        raise TypeError(f"Expected a datetime string or timestamp, got {type(value).__name__}")
+
+    @staticmethod
+    def dec_hook(type_: type, obj: Any) -> Any:
+        """msgspec dec_hook decoding SearchDate fields."""
+        if type_ is SearchDate:
+            return SearchDate.parse(obj)
+        raise NotImplementedError(f"Unsupported type {type_!r}")
+
+
+_SearchDateField = Annotated[
+    SearchDate,
+    msgspec.Meta(
+        extra_json_schema={
+            "anyOf": [{"type": "string", "format": "date-time"}, {"type": "number"}]
+        }
+    ),
+]
+
+
+class SearchRequest(msgspec.Struct, kw_only=True):
+    """Search request body, decoded straight from JSON bytes with msgspec."""
+
     status: Optional[WebhookStatus] = None
     event_type: Optional[str] = None
-    from_date: Optional[datetime] = None
-    to_date: Optional[datetime] = None
+    from_date: Optional[_SearchDateField] = None
+    to_date: Optional[_SearchDateField] = None
     search_query: Optional[str] = None
-    skip: int = Field(default=0, ge=0)
-    limit: int = Field(default=20, ge=1, le=100)
+    skip: Annotated[int, msgspec.Meta(ge=0)] = 0
+    limit: Annotated[int, msgspec.Meta(ge=1, le=100)] = 20
     include_aggregations: bool = True
 
 
@@ -1,16 +1,23 @@
+import asyncio
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Optional, Union
 
+import msgspec
+import orjson
 from bson import ObjectId
-from fastapi import APIRouter, Request, HTTPException, Header
+from fastapi import APIRouter, Depends, Request, HTTPException, Header, Query
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from pymongo.errors import DuplicateKeyError
 
 from app.database import Database
 from app.logging_config import get_logger
-from app.metrics import EVENTS_RECEIVED
+from app.metrics import EVENTS_RECEIVED, PENDING_EVENTS
 from app.models.webhook import (
     WebhookStatus,
     WebhookEvent,
     IngestResponse,
+    SearchDate,
     SearchRequest,
     SearchResponse,
     Aggregations,
@@ -18,16 +25,43 @@ from app.models.webhook import (
     EventTypeCount,
     HourlyCount,
 )
-from app.services.hmac_validator import validate_signature, HMACValidationError
+from app.services.due_queue import DUE_QUEUE_KEY, WAKE_KEY
+from app.services.hmac_validator import validate_signature_streaming, HMACValidationError
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
 
+# Fields returned for each event by search; matches WebhookEvent's serialized form
+_EVENT_PROJECTION = {
+    field.alias or name: 1
+    for name, field in WebhookEvent.model_fields.items()
+    if not field.exclude
+}
+
+# Model defaults for fields older documents may lack (e.g. idempotency_key,
+# delivered_at), so raw search results carry the same keys as the model;
+# factory-default fields are always written at ingest
+_EVENT_DEFAULTS = {
+    field.alias or name: field.default
+    for name, field in WebhookEvent.model_fields.items()
+    if not field.exclude and not field.is_required() and field.default_factory is None
+}
+
+# strict=False accepts numeric strings for numbers, as Pydantic did; the
+# hook decodes the lenient from_date/to_date formats
+_search_request_decoder = msgspec.json.Decoder(
+    SearchRequest, strict=False, dec_hook=SearchDate.dec_hook
+)
+
+# Redis hash of received event counts by event type, shared by all replicas
+_EVENT_TYPE_STATS_KEY = "webhook:stats"
+
 
 @router.post("/ingest", response_model=IngestResponse)
 async def ingest_webhook(
     request: Request,
     x_signature: str = Header(..., alias="X-Signature"),
+    x_idempotency_key: Optional[str] = Header(None, alias="X-Idempotency-Key"),
 ) -> IngestResponse:
     """
     Ingest a webhook event.
@@ -36,23 +70,24 @@ async def ingest_webhook(
     Events are stored with status=RECEIVED and processed asynchronously.
 
     Headers:
-    - X-Signature: HMAC-SHA256 signature of the request body
+    - X-Signature: Hex signature of the request body (HMAC-SHA256 by default)
+    - X-Idempotency-Key: Optional key; repeated keys return the original event
     """
-    # Get raw body for HMAC validation
-    body = await request.body()
-
-    # Validate HMAC signature
+    # Validate the HMAC signature while the body streams in; the hasher
+    # starts from the cached keyed HMAC state
     try:
-        validate_signature(body, x_signature)
+        body = await validate_signature_streaming(request.stream(), x_signature)
     except HMACValidationError as e:
         logger.warning("ingest_hmac_failed: %s", str(e))
         raise HTTPException(status_code=401, detail=str(e))
 
-    # Parse payload
+    # Parse payload from the body assembled during validation
     try:
-        payload: dict[str, Any] = await request.json()
-    except Exception:
+        payload: dict[str, Any] = orjson.loads(body)
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="JSON payload must be an object")
 
     db = Database.get_db()
 
@@ -62,17 +97,40 @@ async def ingest_webhook(
     # Create webhook event
     event = WebhookEvent(
         payload=payload,
+        payload_raw=body,
         status=WebhookStatus.RECEIVED,
         received_at=datetime.now(timezone.utc),
         event_type=event_type,
+        idempotency_key=x_idempotency_key,
     )
 
-    # Store in database
-    result = await db.webhooks.insert_one(event.to_mongo())
+    # Store in database; the unique index on idempotency_key rejects duplicates
+    try:
+        result = await db.webhooks.insert_one(event.to_mongo())
+    except DuplicateKeyError:
+        return await _idempotent_response(db, x_idempotency_key)
     event_id = str(result.inserted_id)
 
+    # Wake up a worker immediately and count the event type across replicas,
+    # in one Redis round-trip; the worker's MongoDB sweep covers failures
+    try:
+        async with Database.get_redis().pipeline(transaction=False) as pipe:
+            pipe.zadd(DUE_QUEUE_KEY, {event_id: event.received_at.timestamp()})
+            # Wake one idle worker; the list never holds more than one token
+            pipe.lpush(WAKE_KEY, 1)
+            pipe.ltrim(WAKE_KEY, 0, 0)
+            pipe.hincrby(_EVENT_TYPE_STATS_KEY, event_type or "unknown", 1)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(
+            "due_queue_enqueue_failed: event_id=%s, error=%s",
+            event_id,
+            str(e),
+        )
+
     # Update metrics
     EVENTS_RECEIVED.labels(event_type=event_type or "unknown").inc()
+    PENDING_EVENTS.inc()
 
     logger.info(
         "ingest_success: event_id=%s, event_type=%s",
@@ -87,8 +145,85 @@ async def ingest_webhook(
     )
 
 
-@router.post("/search", response_model=SearchResponse)
-async def search_webhooks(search: SearchRequest) -> SearchResponse:
+async def _idempotent_response(db, idempotency_key: str) -> IngestResponse:
+    """Build the ingest response for an already-received idempotency key."""
+    existing = await db.webhooks.find_one({"idempotency_key": idempotency_key})
+    if not existing:
+        raise HTTPException(status_code=409, detail="Duplicate idempotency key")
+
+    logger.info(
+        "ingest_duplicate: event_id=%s, idempotency_key=%s",
+        existing["_id"],
+        idempotency_key,
+    )
+
+    return IngestResponse(
+        id=str(existing["_id"]),
+        status=existing["status"],
+        received_at=existing["received_at"],
+        message="Webhook already received",
+    )
+
+
+async def _decode_search_request(request: Request) -> SearchRequest:
+    """Decode the search body with msgspec instead of Pydantic."""
+    body = await request.body()
+    try:
+        return _search_request_decoder.decode(body or b"{}")
+    except msgspec.ValidationError as e:
+        raise _validation_error(e)
+    except msgspec.DecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+
+def _validation_error(e: msgspec.ValidationError) -> RequestValidationError:
+    """Report a msgspec error in FastAPI's usual 422 {loc, msg, type} shape."""
+    # msgspec appends the failing path as " - at `$.field`"; SearchRequest
+    # is flat, so the path is a single field name
+    message, sep, path = str(e).rpartition(" - at `$.")
+    if not sep:
+        return RequestValidationError([{"type": "value_error", "loc": ["body"], "msg": str(e)}])
+    return RequestValidationError(
+        [{"type": "value_error", "loc": ["body", path.rstrip("`")], "msg": message}]
+    )
+
+
+def _inline_refs(schema: Any, defs: dict[str, Any]) -> Any:
+    """Replace local $defs references so the schema stands alone in OpenAPI."""
+    if isinstance(schema, dict):
+        if "$ref" in schema:
+            return _inline_refs(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+        return {key: _inline_refs(value, defs) for key, value in schema.items()}
+    if isinstance(schema, list):
+        return [_inline_refs(item, defs) for item in schema]
+    return schema
+
+
+def _search_request_openapi() -> dict[str, Any]:
+    """Document the msgspec-decoded body, which FastAPI cannot see."""
+    schema = msgspec.json.schema(SearchRequest)
+    return {
+        "requestBody": {
+            "content": {
+                "application/json": {
+                    "schema": _inline_refs(schema, schema.get("$defs", {}))
+                }
+            },
+        }
+    }
+
+
+@router.post(
+    "/search",
+    response_model=SearchResponse,
+    openapi_extra=_search_request_openapi(),
+)
+async def search_webhooks(
+    search: SearchRequest = Depends(_decode_search_request),
+    validate: bool = Query(
+        False, description="Build the response through the SearchResponse model"
+    ),
+) -> Union[SearchResponse, Response]:
     """
     Search and aggregate webhook events.
 
@@ -96,6 +231,10 @@ async def search_webhooks(search: SearchRequest) -> SearchResponse:
     - Filtering by status, event_type, timestamp range
     - Aggregations: count by status, count by event_type, hourly histogram
     - Pagination with skip/limit
+
+    By default events are serialized straight from the MongoDB documents
+    without building Pydantic models; pass ?validate=true to go through
+    the SearchResponse model instead.
     """
     db = Database.get_db()
 
@@ -115,80 +254,100 @@ async def search_webhooks(search: SearchRequest) -> SearchResponse:
         if search.to_date:
             query["received_at"]["$lte"] = search.to_date
 
-    # Get total count
-    total = await db.webhooks.count_documents(query)
-
-    # Get events
-    cursor = db.webhooks.find(query).skip(search.skip).limit(search.limit).sort("received_at", -1)
-    events = [WebhookEvent.from_mongo(doc) async for doc in cursor]
-
-    # Build aggregations if requested
-    aggregations = None
+    # The page is a top-k find on the received_at index, so it is neither
+    # a full sort of the match set nor subject to the 16 MiB limit on a
+    # single aggregation result; count and aggregations run alongside it
+    page = (
+        db.webhooks.find(query, _EVENT_PROJECTION)
+        .sort("received_at", -1)
+        .skip(search.skip)
+        .limit(search.limit)
+        .to_list(search.limit)
+    )
     if search.include_aggregations:
-        aggregations = await _build_aggregations(db, query)
+        facets = {"count": [{"$count": "n"}], **_aggregation_facets()}
+        stats = db.webhooks.aggregate(
+            [{"$match": query}, {"$facet": facets}]
+        ).to_list(1)
+        docs, results = await asyncio.gather(page, stats)
+        result = results[0]
+        total = result["count"][0]["n"] if result["count"] else 0
+        aggregations = _parse_aggregations(result)
+    else:
+        docs, total = await asyncio.gather(page, db.webhooks.count_documents(query))
+        aggregations = None
 
     logger.info(
         "search_complete: total=%d, returned=%d",
         total,
-        len(events),
-    )
-
-    return SearchResponse(
-        events=events,
-        aggregations=aggregations,
-        skip=search.skip,
-        limit=search.limit,
-        total=total,
+        len(docs),
     )
 
-
-async def _build_aggregations(db, base_query: dict) -> Aggregations:
-    """Build aggregation statistics."""
-    aggregations = Aggregations()
-
-    # Count by status
-    status_pipeline = [
-        {"$match": base_query} if base_query else {"$match": {}},
-        {"$group": {"_id": "$status", "count": {"$sum": 1}}},
-    ]
-    status_results = await db.webhooks.aggregate(status_pipeline).to_list(None)
-    aggregations.by_status = [
-        StatusCount(status=r["_id"] or "unknown", count=r["count"])
-        for r in status_results
-    ]
-
-    # Count by event type
-    type_pipeline = [
-        {"$match": base_query} if base_query else {"$match": {}},
-        {"$group": {"_id": "$event_type", "count": {"$sum": 1}}},
-    ]
-    type_results = await db.webhooks.aggregate(type_pipeline).to_list(None)
-    aggregations.by_event_type = [
-        EventTypeCount(event_type=r["_id"] or "unknown", count=r["count"])
-        for r in type_results
-    ]
-
-    # Hourly histogram
-    hourly_pipeline = [
-        {"$match": base_query} if base_query else {"$match": {}},
+    if validate:
+        return SearchResponse(
+            events=[WebhookEvent.from_mongo(doc) for doc in docs],
+            aggregations=aggregations,
+            skip=search.skip,
+            limit=search.limit,
+            total=total,
+        )
+
+    # default=str renders ObjectId the same way WebhookEvent.from_mongo does
+    body = orjson.dumps(
         {
-            "$group": {
-                "_id": {
-                    "$dateToString": {
-                        "format": "%Y-%m-%dT%H:00:00Z",
-                        "date": "$received_at",
-                    }
-                },
-                "count": {"$sum": 1},
-            }
+            "events": [{**_EVENT_DEFAULTS, **doc} for doc in docs],
+            "aggregations": aggregations.model_dump() if aggregations else None,
+            "skip": search.skip,
+            "limit": search.limit,
+            "total": total,
         },
-        {"$sort": {"_id": 1}},
-    ]
-    hourly_results = await db.webhooks.aggregate(hourly_pipeline).to_list(None)
-    aggregations.hourly_histogram = [
-        HourlyCount(hour=r["_id"], count=r["count"])
-        for r in hourly_results
-    ]
+        default=str,
+    )
+    return Response(content=body, media_type="application/json")
+
+
+def _aggregation_facets() -> dict[str, list[dict]]:
+    """Sub-pipelines computing each aggregation over the matched events."""
+    return {
+        "by_status": [
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        ],
+        "by_event_type": [
+            {"$group": {"_id": "$event_type", "count": {"$sum": 1}}},
+        ],
+        "hourly_histogram": [
+            {
+                "$group": {
+                    "_id": {
+                        "$dateToString": {
+                            "format": "%Y-%m-%dT%H:00:00Z",
+                            "date": "$received_at",
+                        }
+                    },
+                    "count": {"$sum": 1},
+                }
+            },
+            {"$sort": {"_id": 1}},
+        ],
+    }
+
+
+def _parse_aggregations(result: dict) -> Aggregations:
+    """Build aggregation statistics from a $facet result document."""
+    aggregations = Aggregations(
+        by_status=[
+            StatusCount(status=r["_id"] or "unknown", count=r["count"])
+            for r in result["by_status"]
+        ],
+        by_event_type=[
+            EventTypeCount(event_type=r["_id"] or "unknown", count=r["count"])
+            for r in result["by_event_type"]
+        ],
+        hourly_histogram=[
+            HourlyCount(hour=r["_id"], count=r["count"])
+            for r in result["hourly_histogram"]
+        ],
+    )
 
     # Total count
     aggregations.total_count = sum(s.count for s in aggregations.by_status)
@@ -202,7 +361,7 @@ async def get_webhook(event_id: str) -> WebhookEvent:
     db = Database.get_db()
 
     try:
-        doc = await db.webhooks.find_one({"_id": ObjectId(event_id)})
+        doc = await db.webhooks.find_one({"_id": ObjectId(event_id)}, {"payload_raw": 0})
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid event ID format")
 
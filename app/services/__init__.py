@@ -2,19 +2,33 @@
 
 from app.services.hmac_validator import (
     validate_signature,
+    validate_signature_streaming,
     generate_signature,
+    generate_signature_bytes,
+    check_hash_backend,
+    check_signature_algorithm,
     HMACValidationError,
 )
 from app.services.circuit_breaker import circuit_breaker, CircuitBreaker, CircuitState
+from app.services.due_queue import DUE_QUEUE_KEY, WAKE_KEY, enqueue_due, pop_due, wait_for_work
 from app.services.delivery_worker import delivery_worker, DeliveryWorker
 
 __all__ = [
     "validate_signature",
+    "validate_signature_streaming",
     "generate_signature",
+    "generate_signature_bytes",
+    "check_hash_backend",
+    "check_signature_algorithm",
     "HMACValidationError",
     "circuit_breaker",
     "CircuitBreaker",
     "CircuitState",
+    "DUE_QUEUE_KEY",
+    "WAKE_KEY",
+    "enqueue_due",
+    "pop_due",
+    "wait_for_work",
     "delivery_worker",
     "DeliveryWorker",
 ]
@@ -3,15 +3,16 @@ Circuit breaker pattern for downstream service protection.
 """
 
 import asyncio
-from datetime import datetime, timedelta, timezone
+import time
 from enum import Enum
-from typing import Optional
 
 from app.logging_config import get_logger
 from app.metrics import CIRCUIT_BREAKER_STATE
 
 logger = get_logger(__name__)
 
+_CB_GAUGE_SET = CIRCUIT_BREAKER_STATE.set
+
 
 class CircuitState(Enum):
     """Circuit breaker states."""
@@ -51,10 +52,19 @@ class CircuitBreaker:
         self._state = CircuitState.CLOSED
         self._failure_count = 0
         self._success_count = 0
-        self._last_failure_time: Optional[datetime] = None
+        # Probe requests let through since entering HALF_OPEN
+        self._half_open_admitted = 0
+        # time.monotonic() of the last failure; 0.0 until one is recorded
+        self._last_failure_time = 0.0
         self._lock = asyncio.Lock()
 
-        CIRCUIT_BREAKER_STATE.set(self._state.value)
+        _CB_GAUGE_SET(self._state.value)
+
+    def _set_state(self, state: CircuitState) -> None:
+        """Transition to a state, updating the gauge only on an actual change."""
+        if state is not self._state:
+            self._state = state
+            _CB_GAUGE_SET(state.value)
 
     @property
     def state(self) -> CircuitState:
@@ -73,6 +83,10 @@ class CircuitBreaker:
         Returns:
             True if request should proceed, False if circuit is open
         """
+        # Lock-free fast path: nothing transitions out of CLOSED here
+        if self._state is CircuitState.CLOSED:
+            return True
+
         async with self._lock:
             if self._state == CircuitState.CLOSED:
                 return True
@@ -80,51 +94,63 @@ class CircuitBreaker:
             if self._state == CircuitState.OPEN:
                 # Check if recovery timeout has passed
                 if self._last_failure_time:
-                    elapsed = datetime.now(timezone.utc) - self._last_failure_time
-                    if elapsed > timedelta(seconds=self.recovery_timeout):
-                        self._state = CircuitState.HALF_OPEN
+                    if time.monotonic() - self._last_failure_time > self.recovery_timeout:
+                        self._set_state(CircuitState.HALF_OPEN)
                         self._success_count = 0
-                        CIRCUIT_BREAKER_STATE.set(self._state.value)
+                        self._half_open_admitted = 1
                         logger.info("circuit_breaker_half_open")
                         return True
                 return False
 
-            # Half-open: allow limited requests
+            # Half-open: admit at most half_open_requests probes
+            if self._half_open_admitted >= self.half_open_requests:
+                return False
+            self._half_open_admitted += 1
             return True
 
     async def record_success(self) -> None:
         """Record a successful request."""
+        if self._state is not CircuitState.HALF_OPEN:
+            # Reset failure count on success; a single attribute store needs
+            # no lock on the event loop
+            self._failure_count = 0
+            return
+
         async with self._lock:
             if self._state == CircuitState.HALF_OPEN:
                 self._success_count += 1
                 if self._success_count >= self.half_open_requests:
-                    self._state = CircuitState.CLOSED
+                    self._set_state(CircuitState.CLOSED)
                     self._failure_count = 0
-                    CIRCUIT_BREAKER_STATE.set(self._state.value)
                     logger.info("circuit_breaker_closed")
             else:
-                # Reset failure count on success in closed state
                 self._failure_count = 0
 
     async def record_failure(self) -> None:
         """Record a failed request."""
-        async with self._lock:
-            self._failure_count += 1
-            self._last_failure_time = datetime.now(timezone.utc)
+        # No await between these stores, so they need no lock on the event loop
+        self._failure_count += 1
+        self._last_failure_time = time.monotonic()
 
+        state = self._state
+        if state is CircuitState.OPEN or (
+            state is CircuitState.CLOSED and self._failure_count < self.failure_threshold
+        ):
+            return
+
+        # Lock only around a possible transition
+        async with self._lock:
             if self._state == CircuitState.HALF_OPEN:
                 # Immediately open on failure in half-open state
-                self._state = CircuitState.OPEN
-                CIRCUIT_BREAKER_STATE.set(self._state.value)
+                self._set_state(CircuitState.OPEN)
                 logger.warning("circuit_breaker_reopened")
 
             elif self._state == CircuitState.CLOSED:
                 if self._failure_count >= self.failure_threshold:
-                    self._state = CircuitState.OPEN
-                    CIRCUIT_BREAKER_STATE.set(self._state.value)
+                    self._set_state(CircuitState.OPEN)
                     logger.warning(
-                        "circuit_breaker_opened",
-                        failure_count=self._failure_count,
+                        "circuit_breaker_opened: failure_count=%d",
+                        self._failure_count,
                     )
 
 
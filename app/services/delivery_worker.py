@@ -1,17 +1,19 @@
 """
 Background delivery worker with exponential backoff retry logic.
 
-Implements multi-replica safety using atomic MongoDB updates with optimistic locking.
+Implements multi-replica safety using atomic MongoDB batch claims with claim tokens.
 """
 
 import asyncio
+import math
 import time
+import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 import httpx
+import orjson
 from bson import ObjectId
-from pymongo import ReturnDocument
 
 from app.config import get_settings
 from app.database import Database
@@ -23,11 +25,26 @@ from app.metrics import (
     DELIVERY_DURATION,
     PENDING_EVENTS,
 )
-from app.models.webhook import WebhookStatus, DeliveryAttempt, WebhookEvent
+from app.models.webhook import WebhookStatus, DeliveryAttempt, WebhookEventInternal
 from app.services.circuit_breaker import circuit_breaker
+from app.services.due_queue import enqueue_due, pop_due, wait_for_work
 
 logger = get_logger(__name__)
 
+# Downstream request timeouts; also bound how long a claimed event can be in flight
+_DELIVERY_TIMEOUT = httpx.Timeout(30.0, connect=5.0, write=5.0, pool=5.0)
+
+# Slack on top of the delivery timeouts for payload reads and status updates
+_LEASE_MARGIN_SECONDS = 10.0
+
+# Load only the fields the worker needs from claimed documents; the decoded
+# payload is skipped since payload_raw already holds the body to deliver
+_CLAIM_PROJECTION = {
+    field: 1
+    for field in WebhookEventInternal.__struct_encode_fields__
+    if field != "payload"
+}
+
 
 class DeliveryWorker:
     """
@@ -35,7 +52,9 @@ class DeliveryWorker:
 
     Features:
     - Exponential backoff (1s → 2s → 4s → 8s → 16s)
-    - Multi-replica safety via atomic claims
+    - Redis due queue wake-ups with a periodic MongoDB sweep fallback
+    - Multi-replica safety via atomic batch claims
+    - Concurrent delivery of each claimed batch
     - Circuit breaker integration
     - Comprehensive delivery logging
     """
@@ -45,6 +64,14 @@ class DeliveryWorker:
         self._running = False
         self._task: Optional[asyncio.Task] = None
         self._http_client: Optional[httpx.AsyncClient] = None
+        self._last_run: dict[str, float] = {}
+        self._semaphore = asyncio.Semaphore(self.settings.delivery_concurrency)
+        self._claim_lease = self._compute_claim_lease()
+        # Retry delays indexed by attempt_number - 1: 1s, 2s, 4s, 8s, 16s
+        self._backoff_table = tuple(
+            self._compute_backoff(attempt_number)
+            for attempt_number in range(1, self.settings.max_retry_attempts + 1)
+        )
 
     async def start(self) -> None:
         """Start the delivery worker."""
@@ -52,10 +79,28 @@ class DeliveryWorker:
             return
 
         self._running = True
-        self._http_client = httpx.AsyncClient(timeout=30.0)
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.settings.httpx_max_connections,
+                max_keepalive_connections=self.settings.httpx_max_keepalive,
+            ),
+            timeout=_DELIVERY_TIMEOUT,
+            http2=self.settings.httpx_http2,
+        )
+        await self._preconnect()
         self._task = asyncio.create_task(self._run())
         logger.info("delivery_worker_started")
 
+    async def _preconnect(self) -> None:
+        """Open a pooled downstream connection so the first delivery skips setup."""
+        try:
+            # Short timeout: a hung downstream must not hold up startup
+            await self._http_client.get(
+                f"{self.settings.downstream_url}/health", timeout=2.0
+            )
+        except Exception as e:
+            logger.warning("delivery_preconnect_failed: error=%s", str(e))
+
     async def stop(self) -> None:
         """Stop the delivery worker."""
         self._running = False
@@ -73,14 +118,21 @@ class DeliveryWorker:
         """Main worker loop."""
         while self._running:
             try:
-                # Process pending events
-                await self._process_pending_events()
+                # Fast path: claim events announced in the Redis due queue
+                queue_ok, drained = await self._process_due_events()
 
-                # Update pending events gauge
-                await self._update_pending_count()
+                # Fallback MongoDB sweep picks up events the queue missed
+                # (worker crashes, Redis outages); runs every tick without Redis
+                if not queue_ok or self._every("sweep", self.settings.mongo_sweep_interval):
+                    await self._process_pending_events()
 
-                # Sleep before next poll
-                await asyncio.sleep(self.settings.worker_poll_interval)
+                # Correct drift in the pending events gauge
+                await self._reconcile_pending_count()
+
+                # Go straight to the next tick while the due queue has a
+                # backlog; otherwise wait for new work
+                if drained:
+                    await self._wait_for_work(queue_ok)
 
             except asyncio.CancelledError:
                 break
@@ -88,9 +140,103 @@ class DeliveryWorker:
                 logger.error("delivery_worker_error: error=%s", str(e))
                 await asyncio.sleep(self.settings.worker_poll_interval)
 
+    def _every(self, name: str, interval: float) -> bool:
+        """Return True at most once per `interval` seconds for the named task."""
+        now = time.monotonic()
+        last = self._last_run.get(name)
+        if last is not None and now - last < interval:
+            return False
+        self._last_run[name] = now
+        return True
+
+    async def _process_due_events(self) -> tuple[bool, bool]:
+        """
+        Claim and process events whose IDs are due in the Redis queue.
+
+        At most due_queue_max_batches batches are processed per call, so a
+        queue that refills as fast as it drains cannot starve the MongoDB
+        sweep and gauge reconciliation.
+
+        Returns:
+            (queue_ok, drained): queue_ok is False if the due queue could not
+            be read; drained is False if due events may remain
+        """
+        db = Database.get_db()
+
+        for _ in range(self.settings.due_queue_max_batches):
+            if not self._running:
+                break
+            try:
+                event_ids = await pop_due(
+                    Database.get_redis(), self.settings.worker_batch_size
+                )
+            except Exception as e:
+                logger.warning("due_queue_error: error=%s", str(e))
+                return False, True
+
+            if not event_ids:
+                return True, True
+
+            ids = [ObjectId(event_id) for event_id in event_ids if ObjectId.is_valid(event_id)]
+            events = await self._claim_batch(db, ids)
+            await self._deliver_batch(events)
+
+        return True, False
+
+    async def _wait_for_work(self, queue_ok: bool) -> None:
+        """Wait up to worker_poll_interval, returning early when ingest signals work."""
+        if queue_ok:
+            try:
+                await wait_for_work(Database.get_redis(), self.settings.worker_poll_interval)
+                return
+            except Exception as e:
+                logger.warning("due_queue_wait_error: error=%s", str(e))
+        await asyncio.sleep(self.settings.worker_poll_interval)
+
     async def _process_pending_events(self) -> None:
-        """Find and process events ready for delivery."""
+        """Claim and process batches of events ready for delivery from MongoDB."""
         db = Database.get_db()
+
+        while self._running:
+            events = await self._claim_batch(db)
+            if not events:
+                break
+
+            await self._deliver_batch(events)
+
+    async def _deliver_batch(self, events: list[WebhookEventInternal]) -> None:
+        """Deliver claimed events concurrently, bounded by delivery_concurrency."""
+        results = await asyncio.gather(
+            *(self._deliver_guarded(event) for event in events),
+            return_exceptions=True,
+        )
+
+        # One failing delivery must not abort the rest of the batch
+        for event, result in zip(events, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    "delivery_error: event_id=%s, error=%s",
+                    event.id,
+                    str(result),
+                )
+
+    async def _deliver_guarded(self, event: WebhookEventInternal) -> None:
+        """Deliver an event while holding a delivery concurrency slot."""
+        async with self._semaphore:
+            await self._deliver_event(event)
+
+    async def _claim_batch(
+        self, db, ids: Optional[list[ObjectId]] = None
+    ) -> list[WebhookEventInternal]:
+        """
+        Atomically claim a batch of events for processing.
+
+        Candidate IDs come from the due queue or, if not given, a capped find.
+        They are claimed with a single update_many that re-applies the ready
+        filter and stamps a unique claim token. Only documents that are still
+        claimable at update time receive the token, so each event is claimed
+        by exactly one replica.
+        """
         now = datetime.now(timezone.utc)
 
         # Find events that are RECEIVED or need retry
@@ -104,40 +250,38 @@ class DeliveryWorker:
             ]
         }
 
-        # Process events one at a time with atomic claim
-        while self._running:
-            event = await self._claim_event(db, query)
-            if not event:
-                break
-
-            await self._deliver_event(event)
-
-    async def _claim_event(self, db, query: dict) -> Optional[WebhookEvent]:
-        """
-        Atomically claim an event for processing.
-
-        Uses findOneAndUpdate with version check for multi-replica safety.
-        Only one replica will successfully claim each event.
-        """
         try:
-            result = await db.webhooks.find_one_and_update(
-                query,
+            if ids is None:
+                cursor = db.webhooks.find(query, {"_id": 1}).limit(
+                    self.settings.worker_batch_size
+                )
+                ids = [doc["_id"] async for doc in cursor]
+            if not ids:
+                return []
+
+            token = str(uuid.uuid4())
+            await db.webhooks.update_many(
+                {"_id": {"$in": ids}, **query},
                 {
-                    "$set": {"status": WebhookStatus.PROCESSING.value},
+                    "$set": {
+                        "status": WebhookStatus.PROCESSING.value,
+                        "claim_token": token,
+                        "claimed_at": now,
+                        # Lease: events of a crashed worker become claimable again
+                        "next_retry_at": now + timedelta(seconds=self._claim_lease),
+                    },
                     "$inc": {"version": 1},
                 },
-                return_document=ReturnDocument.AFTER,
             )
 
-            if result:
-                return WebhookEvent.from_mongo(result)
-            return None
+            cursor = db.webhooks.find({"claim_token": token}, _CLAIM_PROJECTION)
+            return [WebhookEventInternal.from_mongo(doc) async for doc in cursor]
 
         except Exception as e:
-            logger.error("claim_event_error: error=%s", str(e))
-            return None
+            logger.error("claim_batch_error: error=%s", str(e))
+            return []
 
-    async def _deliver_event(self, event: WebhookEvent) -> None:
+    async def _deliver_event(self, event: WebhookEventInternal) -> None:
         """Attempt to deliver an event to the downstream service."""
         attempt_number = len(event.delivery_attempts) + 1
         event_type = event.event_type or "unknown"
@@ -158,31 +302,42 @@ class DeliveryWorker:
                 event.id,
             )
             # Schedule retry later
-            await self._schedule_retry(event, attempt_number)
+            await self._schedule_retry(event, attempt_number, datetime.now(timezone.utc))
             return
 
-        # Attempt delivery
-        start_time = time.time()
+        content = await self._payload_bytes(event)
+
+        # Attempt delivery; the wall clock is read once and later times are
+        # derived from the loop's monotonic clock
+        loop = asyncio.get_running_loop()
+        started_at = datetime.now(timezone.utc)
+        start_time = loop.time()
         attempt = DeliveryAttempt(
             attempt_number=attempt_number,
             success=False,
+            timestamp=started_at,
         )
 
         try:
             response = await self._http_client.post(
                 f"{self.settings.downstream_url}/downstream/receive",
-                json=event.payload,
-                headers={"X-Event-Id": event.id or ""},
+                content=content,
+                headers={
+                    "Content-Type": "application/json",
+                    "X-Event-Id": str(event.id),
+                },
             )
 
-            duration_ms = (time.time() - start_time) * 1000
+            elapsed = loop.time() - start_time
+            duration_ms = elapsed * 1000
+            now = started_at + timedelta(seconds=elapsed)
             attempt.status_code = response.status_code
             attempt.duration_ms = duration_ms
             DELIVERY_DURATION.observe(duration_ms / 1000)
 
             if response.status_code == 200:
                 attempt.success = True
-                await self._mark_delivered(event, attempt)
+                await self._mark_delivered(event, attempt, now)
                 await circuit_breaker.record_success()
                 EVENTS_DELIVERED.labels(event_type=event_type).inc()
                 logger.info(
@@ -194,30 +349,49 @@ class DeliveryWorker:
             else:
                 attempt.error_message = f"HTTP {response.status_code}"
                 await circuit_breaker.record_failure()
-                await self._handle_failure(event, attempt, attempt_number, event_type)
+                await self._handle_failure(event, attempt, attempt_number, event_type, now)
 
         except httpx.TimeoutException:
-            duration_ms = (time.time() - start_time) * 1000
+            elapsed = loop.time() - start_time
             attempt.error_message = "Timeout"
-            attempt.duration_ms = duration_ms
+            attempt.duration_ms = elapsed * 1000
             await circuit_breaker.record_failure()
-            await self._handle_failure(event, attempt, attempt_number, event_type)
+            await self._handle_failure(
+                event, attempt, attempt_number, event_type,
+                started_at + timedelta(seconds=elapsed),
+            )
 
         except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
+            elapsed = loop.time() - start_time
             attempt.error_message = str(e)
-            attempt.duration_ms = duration_ms
+            attempt.duration_ms = elapsed * 1000
             await circuit_breaker.record_failure()
-            await self._handle_failure(event, attempt, attempt_number, event_type)
+            await self._handle_failure(
+                event, attempt, attempt_number, event_type,
+                started_at + timedelta(seconds=elapsed),
+            )
+
+    @staticmethod
+    async def _payload_bytes(event: WebhookEventInternal) -> bytes:
+        """Get the request body to deliver, reusing the bytes stored at ingest."""
+        if event.payload_raw is not None:
+            return event.payload_raw
+        # Events ingested before payload_raw was stored; claims skip payload
+        if event.payload is None:
+            db = Database.get_db()
+            doc = await db.webhooks.find_one({"_id": event.id}, {"payload": 1})
+            event.payload = doc["payload"] if doc else {}
+        return orjson.dumps(event.payload)
 
     async def _handle_failure(
         self,
-        event: WebhookEvent,
+        event: WebhookEventInternal,
         attempt: DeliveryAttempt,
         attempt_number: int,
         event_type: str,
+        now: datetime,
     ) -> None:
-        """Handle a failed delivery attempt."""
+        """Handle a failed delivery attempt that finished at `now`."""
         logger.warning(
             "delivery_failed: event_id=%s, attempt=%d, error=%s",
             event.id,
@@ -226,29 +400,30 @@ class DeliveryWorker:
         )
 
         if attempt_number >= self.settings.max_retry_attempts:
-            await self._mark_failed_permanently(event, attempt)
+            await self._mark_failed_permanently(event, attempt, now)
             EVENTS_FAILED.labels(event_type=event_type).inc()
         else:
-            await self._schedule_retry(event, attempt_number, attempt)
+            await self._schedule_retry(event, attempt_number, now, attempt)
 
     async def _mark_delivered(
-        self, event: WebhookEvent, attempt: DeliveryAttempt
+        self, event: WebhookEventInternal, attempt: DeliveryAttempt, now: datetime
     ) -> None:
         """Mark event as successfully delivered."""
         db = Database.get_db()
         await db.webhooks.update_one(
-            {"_id": ObjectId(event.id)},
+            {"_id": event.id},
             {
                 "$set": {
                     "status": WebhookStatus.DELIVERED.value,
-                    "delivered_at": datetime.now(timezone.utc),
+                    "delivered_at": now,
                 },
-                "$push": {"delivery_attempts": attempt.model_dump()},
+                "$push": {"delivery_attempts": attempt.to_mongo()},
             },
         )
+        PENDING_EVENTS.dec()
 
     async def _mark_failed_permanently(
-        self, event: WebhookEvent, attempt: DeliveryAttempt
+        self, event: WebhookEventInternal, attempt: DeliveryAttempt, now: datetime
     ) -> None:
         """Mark event as permanently failed (dead letter)."""
         db = Database.get_db()
@@ -258,29 +433,57 @@ class DeliveryWorker:
             len(event.delivery_attempts) + 1,
         )
         await db.webhooks.update_one(
-            {"_id": ObjectId(event.id)},
+            {"_id": event.id},
             {
                 "$set": {
                     "status": WebhookStatus.FAILED_PERMANENTLY.value,
-                    "failed_at": datetime.now(timezone.utc),
+                    "failed_at": now,
                 },
-                "$push": {"delivery_attempts": attempt.model_dump()},
+                "$push": {"delivery_attempts": attempt.to_mongo()},
             },
         )
+        PENDING_EVENTS.dec()
+
+    def _compute_claim_lease(self) -> float:
+        """
+        Claim lease long enough for a whole batch to time out.
+
+        A batch is delivered in ceil(batch_size / concurrency) waves, each of
+        which can take every httpx timeout phase in the worst case; a shorter
+        lease would let another replica reclaim events still in flight.
+        """
+        attempt_seconds = sum(
+            getattr(_DELIVERY_TIMEOUT, phase) for phase in ("connect", "read", "write", "pool")
+        )
+        waves = math.ceil(self.settings.worker_batch_size / self.settings.delivery_concurrency)
+        return max(
+            self.settings.claim_lease_seconds,
+            waves * attempt_seconds + _LEASE_MARGIN_SECONDS,
+        )
+
+    def _compute_backoff(self, attempt_number: int) -> float:
+        """Exponential backoff delay in seconds, capped at retry_max_delay."""
+        return min(
+            self.settings.retry_base_delay * (2 ** (attempt_number - 1)),
+            self.settings.retry_max_delay,
+        )
+
+    def _backoff_delay(self, attempt_number: int) -> float:
+        """Look up the retry delay for an attempt number."""
+        if 0 < attempt_number <= len(self._backoff_table):
+            return self._backoff_table[attempt_number - 1]
+        return self._compute_backoff(attempt_number)
 
     async def _schedule_retry(
         self,
-        event: WebhookEvent,
+        event: WebhookEventInternal,
         attempt_number: int,
+        now: datetime,
         attempt: Optional[DeliveryAttempt] = None,
     ) -> None:
-        """Schedule event for retry with exponential backoff."""
-        # Calculate backoff: 1s, 2s, 4s, 8s, 16s
-        delay = min(
-            self.settings.retry_base_delay * (2 ** (attempt_number - 1)),
-            self.settings.retry_max_delay,
-        )
-        next_retry = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        """Schedule event for retry with exponential backoff from `now`."""
+        delay = self._backoff_delay(attempt_number)
+        next_retry = now + timedelta(seconds=delay)
 
         logger.info(
             "delivery_retry_scheduled: event_id=%s, next_attempt=%d, delay_seconds=%.1f",
@@ -294,28 +497,51 @@ class DeliveryWorker:
             "$set": {"next_retry_at": next_retry},
         }
         if attempt:
-            update["$push"] = {"delivery_attempts": attempt.model_dump()}
+            update["$push"] = {"delivery_attempts": attempt.to_mongo()}
 
         await db.webhooks.update_one(
-            {"_id": ObjectId(event.id)},
+            {"_id": event.id},
             update,
         )
 
-    async def _update_pending_count(self) -> None:
-        """Update the pending events gauge."""
+        try:
+            await enqueue_due(Database.get_redis(), str(event.id), next_retry)
+        except Exception as e:
+            # The MongoDB sweep still picks the event up once it is due
+            logger.warning(
+                "due_queue_enqueue_failed: event_id=%s, error=%s",
+                event.id,
+                str(e),
+            )
+
+    async def _reconcile_pending_count(self) -> None:
+        """
+        Periodically reconcile the pending events gauge with MongoDB.
+
+        The gauge is adjusted inline on ingest and on terminal delivery outcomes,
+        so a full count is only needed every pending_reconcile_interval seconds
+        to correct drift (e.g. events ingested or finished by other replicas).
+        """
+        if not self._every("reconcile", self.settings.pending_reconcile_interval):
+            return
+
         try:
             db = Database.get_db()
-            count = await db.webhooks.count_documents(
+            pipeline = [
                 {
-                    "status": {
-                        "$in": [
-                            WebhookStatus.RECEIVED.value,
-                            WebhookStatus.PROCESSING.value,
-                        ]
+                    "$match": {
+                        "status": {
+                            "$in": [
+                                WebhookStatus.RECEIVED.value,
+                                WebhookStatus.PROCESSING.value,
+                            ]
+                        }
                     }
-                }
-            )
-            PENDING_EVENTS.set(count)
+                },
+                {"$count": "n"},
+            ]
+            result = await db.webhooks.aggregate(pipeline).to_list(1)
+            PENDING_EVENTS.set(result[0]["n"] if result else 0)
         except Exception:
             pass
 
@@ -0,0 +1,66 @@
+"""
+Redis due queue for webhook delivery.
+
+Event IDs are kept in a sorted set scored by the epoch time at which they
+become due. MongoDB remains the source of truth for event state; the queue
+only tells workers which events to claim, so idle workers do not poll MongoDB.
+
+Ingest also pushes a token onto a one-element wake list; idle workers block
+on it, so new events are picked up without waiting out the poll interval.
+"""
+
+import time
+from datetime import datetime
+
+from redis.asyncio import Redis
+
+DUE_QUEUE_KEY = "webhook:due"
+WAKE_KEY = "webhook:wake"
+
+
+async def enqueue_due(redis: Redis, event_id: str, due_at: datetime) -> None:
+    """
+    Add an event to the due queue.
+
+    Args:
+        redis: Redis client
+        event_id: Event ID as a string
+        due_at: Time at which the event should be delivered
+    """
+    await redis.zadd(DUE_QUEUE_KEY, {event_id: due_at.timestamp()})
+
+
+async def pop_due(redis: Redis, limit: int) -> list[str]:
+    """
+    Remove and return up to `limit` event IDs that are due now.
+
+    Two replicas may pop the same IDs concurrently; the MongoDB claim
+    decides which one delivers each event.
+
+    Args:
+        redis: Redis client
+        limit: Maximum number of IDs to return
+
+    Returns:
+        Due event IDs, earliest first
+    """
+    event_ids = await redis.zrangebyscore(
+        DUE_QUEUE_KEY, 0, time.time(), start=0, num=limit
+    )
+    if event_ids:
+        await redis.zrem(DUE_QUEUE_KEY, *event_ids)
+    return event_ids
+
+
+async def wait_for_work(redis: Redis, timeout: float) -> bool:
+    """
+    Block until ingest signals new work or `timeout` seconds pass.
+
+    Args:
+        redis: Redis client
+        timeout: Maximum seconds to wait
+
+    Returns:
+        True if woken by a signal, False on timeout
+    """
+    return await redis.blpop([WAKE_KEY], timeout=timeout) is not None
@@ -1,10 +1,12 @@
 import asyncio
+import bisect
 import logging
+import os
 import random
 import time
-from collections import deque
 from typing import Any
 
+import orjson
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
 
@@ -28,23 +30,27 @@ class RateLimiter:
     def __init__(self, max_requests: int = 3, window_seconds: float = 1.0):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests: deque[float] = deque()
+        # Ring buffer of the last max_requests accepted timestamps
+        self._slots: list[float] = [float("-inf")] * max_requests
+        self._idx = 0
 
     def is_allowed(self) -> bool:
         """Check if a request is allowed under rate limit."""
-        now = time.time()
+        now = time.monotonic()
 
-        # Remove expired timestamps
-        while self.requests and now - self.requests[0] > self.window_seconds:
-            self.requests.popleft()
-
-        # Check if under limit
-        if len(self.requests) < self.max_requests:
-            self.requests.append(now)
+        # The slot at _idx holds the oldest accepted request
+        if now - self._slots[self._idx] > self.window_seconds:
+            self._slots[self._idx] = now
+            self._idx = (self._idx + 1) % self.max_requests
             return True
 
         return False
 
+    def current_count(self) -> int:
+        """Number of accepted requests in the current window."""
+        now = time.monotonic()
+        return sum(1 for ts in self._slots if now - ts <= self.window_seconds)
+
 
 # Global rate limiter: 3 requests per second
 rate_limiter = RateLimiter(max_requests=3, window_seconds=1.0)
@@ -55,6 +61,67 @@ TIMEOUT_PROBABILITY = 0.4  # 40% of failures are timeouts
 ERROR_500_PROBABILITY = 0.35  # 35% of failures are 500 errors
 # Remaining 25% of failures are 429 errors
 
+# Set DOWNSTREAM_FAILURES_ENABLED=false to disable failure injection (e.g. load tests)
+_FAILURES_ENABLED = os.getenv("DOWNSTREAM_FAILURES_ENABLED", "true").lower() not in ("0", "false", "no")
+
+# Dedicated RNG for failure injection
+_rng = random.Random()
+
+
+async def _inject_timeout(event_id: str) -> None:
+    """Simulate a slow downstream (2-5 seconds), then fail half the time."""
+    delay = _rng.random() * 3.0 + 2.0
+    logger.info(
+        "injecting_timeout: event_id=%s, delay_seconds=%s",
+        event_id,
+        delay,
+    )
+    await asyncio.sleep(delay)
+    # After delay, either succeed or fail
+    if _rng.random() < 0.5:
+        raise HTTPException(
+            status_code=504,
+            detail="Gateway Timeout",
+        )
+
+
+async def _inject_500(event_id: str) -> None:
+    """Return a 500 error."""
+    logger.info(
+        "injecting_500_error: event_id=%s",
+        event_id,
+    )
+    raise HTTPException(
+        status_code=500,
+        detail="Internal Server Error - Simulated failure",
+    )
+
+
+async def _inject_429(event_id: str) -> None:
+    """Return a 429 error."""
+    logger.info(
+        "injecting_429_error: event_id=%s",
+        event_id,
+    )
+    raise HTTPException(
+        status_code=429,
+        detail="Too Many Requests - Simulated failure",
+    )
+
+
+# Cumulative failure-type thresholds and their handlers, in matching order
+_FAIL_CUM = [
+    TIMEOUT_PROBABILITY,
+    TIMEOUT_PROBABILITY + ERROR_500_PROBABILITY,
+    1.0,
+]
+_FAIL_HANDLERS = [_inject_timeout, _inject_500, _inject_429]
+
+
+def _event_id(request: Request) -> str:
+    """Read the event ID header, only when it is about to be used."""
+    return request.headers.get("X-Event-Id", "unknown")
+
 
 @app.post("/downstream/receive")
 async def receive_webhook(request: Request) -> dict[str, Any]:
@@ -68,13 +135,11 @@ async def receive_webhook(request: Request) -> dict[str, Any]:
       - 429 Too Many Requests
       - Timeout (2-5 seconds delay)
     """
-    event_id = request.headers.get("X-Event-Id", "unknown")
-
     # Check rate limit
     if not rate_limiter.is_allowed():
         logger.warning(
             "rate_limit_exceeded: event_id=%s",
-            event_id,
+            _event_id(request),
         )
         raise HTTPException(
             status_code=429,
@@ -82,58 +147,24 @@ async def receive_webhook(request: Request) -> dict[str, Any]:
         )
 
     # Random failure injection
-    if random.random() < FAILURE_RATE:
-        failure_type = random.random()
-
-        if failure_type < TIMEOUT_PROBABILITY:
-            # Simulate timeout (2-5 seconds)
-            delay = random.uniform(2.0, 5.0)
-            logger.info(
-                "injecting_timeout: event_id=%s, delay_seconds=%s",
-                event_id,
-                delay,
-            )
-            await asyncio.sleep(delay)
-            # After delay, either succeed or fail
-            if random.random() < 0.5:
-                raise HTTPException(
-                    status_code=504,
-                    detail="Gateway Timeout",
-                )
-
-        elif failure_type < TIMEOUT_PROBABILITY + ERROR_500_PROBABILITY:
-            # Return 500 error
-            logger.info(
-                "injecting_500_error: event_id=%s",
-                event_id,
-            )
-            raise HTTPException(
-                status_code=500,
-                detail="Internal Server Error - Simulated failure",
-            )
-
-        else:
-            # Return 429 error
-            logger.info(
-                "injecting_429_error: event_id=%s",
-                event_id,
-            )
-            raise HTTPException(
-                status_code=429,
-                detail="Too Many Requests - Simulated failure",
-            )
-
-    # Parse payload
+    if _FAILURES_ENABLED and _rng.random() < FAILURE_RATE:
+        idx = bisect.bisect_right(_FAIL_CUM, _rng.random())
+        await _FAIL_HANDLERS[idx](_event_id(request))
+
+    # Reject bodies that are not valid JSON
     try:
-        payload = await request.json()
+        body = await request.body()
+        orjson.loads(body)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
 
-    logger.info(
-        "webhook_received: event_id=%s, payload_size=%d",
-        event_id,
-        len(str(payload)),
-    )
+    event_id = _event_id(request)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "webhook_received: event_id=%s, payload_size=%d",
+            event_id,
+            len(body),
+        )
 
     return {
         "status": "received",
@@ -155,7 +186,7 @@ async def health_check() -> dict:
 async def get_stats() -> dict:
     """Get rate limiter stats."""
     return {
-        "current_window_requests": len(rate_limiter.requests),
+        "current_window_requests": rate_limiter.current_count(),
         "max_requests_per_second": rate_limiter.max_requests,
-        "failure_rate": FAILURE_RATE,
+        "failure_rate": FAILURE_RATE if _FAILURES_ENABLED else 0.0,
     }
@@ -0,0 +1,27 @@
+"""
+Shared pytest fixtures.
+"""
+
+import pytest
+
+from app.services.hmac_validator import generate_signature
+
+
+@pytest.fixture(scope="session")
+def sig_cache():
+    """Signatures computed so far, keyed by (payload, secret)."""
+    return {}
+
+
+@pytest.fixture(scope="session")
+def sig_for(sig_cache):
+    """Return a signer that computes each (payload, secret) signature once per session."""
+
+    def _sig_for(payload: bytes, secret: str) -> str:
+        key = (payload, secret)
+        signature = sig_cache.get(key)
+        if signature is None:
+            signature = sig_cache[key] = generate_signature(payload, secret)
+        return signature
+
+    return _sig_for
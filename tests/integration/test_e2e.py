@@ -1,15 +1,16 @@
 import pytest
-from datetime import datetime,timezone
 from unittest.mock import patch, AsyncMock
 import json
 
+from app.services.hmac_validator import generate_signature
+
 
 class TestWebhookIngestion:
     """Integration tests for webhook ingestion flow."""
 
-    @pytest.fixture
+    @pytest.fixture(scope="session")
     def sample_payload(self):
-        """Sample webhook payload."""
+        """Sample webhook payload with a fixed timestamp."""
         return {
             "event_type": "order.created",
             "data": {
@@ -17,7 +18,7 @@ class TestWebhookIngestion:
                 "customer": "test@example.com",
                 "total": 99.99,
             },
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": "2024-01-01T00:00:00+00:00",
         }
 
     @pytest.fixture
@@ -27,14 +28,7 @@ class TestWebhookIngestion:
 
     def generate_signature(self, payload: bytes, secret: str) -> str:
         """Generate HMAC signature for testing."""
-        import hmac
-        import hashlib
-
-        return hmac.new(
-            secret.encode("utf-8"),
-            payload,
-            hashlib.sha256,
-        ).hexdigest()
+        return generate_signature(payload, secret)
 
     @pytest.mark.asyncio
     async def test_full_ingestion_flow(self, sample_payload, hmac_secret):
@@ -1,132 +1,98 @@
 """
-Circuit breaker pattern for downstream service protection.
+Tests for the downstream circuit breaker.
 """
 
 import asyncio
-from datetime import datetime, timedelta, timezone
-from enum import Enum
-from typing import Optional
-
-from app.logging_config import get_logger
-from app.metrics import CIRCUIT_BREAKER_STATE
-
-logger = get_logger(__name__)
-
-
-class CircuitState(Enum):
-    """Circuit breaker states."""
-
-    CLOSED = 0  # Normal operation
-    OPEN = 1  # Failing, reject requests
-    HALF_OPEN = 2  # Testing if service recovered
-
-
-class CircuitBreaker:
-    """
-    Circuit breaker for protecting against downstream failures.
-
-    When failures exceed threshold, the circuit opens and rejects requests
-    for a cooldown period. After cooldown, it enters half-open state to test
-    if the downstream service has recovered.
-    """
-
-    def __init__(
-        self,
-        failure_threshold: int = 5,
-        recovery_timeout: float = 30.0,
-        half_open_requests: int = 3,
-    ):
-        """
-        Initialize circuit breaker.
-
-        Args:
-            failure_threshold: Number of failures before opening circuit
-            recovery_timeout: Seconds to wait before trying again
-            half_open_requests: Successful requests needed to close circuit
-        """
-        self.failure_threshold = failure_threshold
-        self.recovery_timeout = recovery_timeout
-        self.half_open_requests = half_open_requests
-
-        self._state = CircuitState.CLOSED
-        self._failure_count = 0
-        self._success_count = 0
-        self._last_failure_time: Optional[datetime] = None
-        self._lock = asyncio.Lock()
-
-        CIRCUIT_BREAKER_STATE.set(self._state.value)
-
-    @property
-    def state(self) -> CircuitState:
-        """Get current circuit state."""
-        return self._state
-
-    @property
-    def is_closed(self) -> bool:
-        """Check if circuit is closed (normal operation)."""
-        return self._state == CircuitState.CLOSED
-
-    async def can_execute(self) -> bool:
-        """
-        Check if a request can be executed.
-
-        Returns:
-            True if request should proceed, False if circuit is open
-        """
-        async with self._lock:
-            if self._state == CircuitState.CLOSED:
-                return True
-
-            if self._state == CircuitState.OPEN:
-                # Check if recovery timeout has passed
-                if self._last_failure_time:
-                    elapsed = datetime.now(timezone.utc) - self._last_failure_time
-                    if elapsed > timedelta(seconds=self.recovery_timeout):
-                        self._state = CircuitState.HALF_OPEN
-                        self._success_count = 0
-                        CIRCUIT_BREAKER_STATE.set(self._state.value)
-                        logger.info("circuit_breaker_half_open")
-                        return True
-                return False
-
-            # Half-open: allow limited requests
-            return True
-
-    async def record_success(self) -> None:
-        """Record a successful request."""
-        async with self._lock:
-            if self._state == CircuitState.HALF_OPEN:
-                self._success_count += 1
-                if self._success_count >= self.half_open_requests:
-                    self._state = CircuitState.CLOSED
-                    self._failure_count = 0
-                    CIRCUIT_BREAKER_STATE.set(self._state.value)
-                    logger.info("circuit_breaker_closed")
-            else:
-                # Reset failure count on success in closed state
-                self._failure_count = 0
-
-    async def record_failure(self) -> None:
-        """Record a failed request."""
-        async with self._lock:
-            self._failure_count += 1
-            self._last_failure_time = datetime.now(timezone.utc)
-
-            if self._state == CircuitState.HALF_OPEN:
-                # Immediately open on failure in half-open state
-                self._state = CircuitState.OPEN
-                CIRCUIT_BREAKER_STATE.set(self._state.value)
-                logger.warning("circuit_breaker_reopened")
-
-            elif self._state == CircuitState.CLOSED:
-                if self._failure_count >= self.failure_threshold:
-                    self._state = CircuitState.OPEN
-                    CIRCUIT_BREAKER_STATE.set(self._state.value)
-                    logger.warning(
-                        "circuit_breaker_opened: failure_count=%d",
-                        self._failure_count,
-                    )
-
-
-# Global circuit breaker instance
-circuit_breaker = CircuitBreaker()
+import time
+from unittest.mock import patch
+
+from app.services.circuit_breaker import CircuitBreaker, CircuitState
+
+
+class TestCircuitBreaker:
+    """Test circuit breaker state transitions."""
+
+    async def test_closed_allows_requests(self):
+        """Test a closed circuit allows requests."""
+        breaker = CircuitBreaker()
+
+        assert breaker.state == CircuitState.CLOSED
+        assert await breaker.can_execute() is True
+
+    async def test_opens_after_threshold(self):
+        """Test the circuit opens after failure_threshold failures."""
+        breaker = CircuitBreaker(failure_threshold=3)
+
+        for _ in range(2):
+            await breaker.record_failure()
+        assert breaker.state == CircuitState.CLOSED
+
+        await breaker.record_failure()
+
+        assert breaker.state == CircuitState.OPEN
+        assert await breaker.can_execute() is False
+
+    async def test_success_resets_failure_count(self):
+        """Test a success in closed state resets the failure count."""
+        breaker = CircuitBreaker(failure_threshold=3)
+
+        await breaker.record_failure()
+        await breaker.record_failure()
+        await breaker.record_success()
+        await breaker.record_failure()
+
+        assert breaker.state == CircuitState.CLOSED
+
+    async def test_half_open_after_recovery_timeout(self):
+        """Test an open circuit goes half-open once the timeout passes."""
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30.0)
+        await breaker.record_failure()
+
+        breaker._last_failure_time = time.monotonic() - 31
+
+        assert await breaker.can_execute() is True
+        assert breaker.state == CircuitState.HALF_OPEN
+
+    async def test_half_open_limits_concurrent_probes(self):
+        """Test half-open admits at most half_open_requests probes."""
+        breaker = CircuitBreaker(
+            failure_threshold=1, recovery_timeout=30.0, half_open_requests=3
+        )
+        await breaker.record_failure()
+        breaker._last_failure_time = time.monotonic() - 31
+
+        admitted = await asyncio.gather(*(breaker.can_execute() for _ in range(32)))
+
+        assert sum(admitted) == 3
+        assert breaker.state == CircuitState.HALF_OPEN
+
+    async def test_half_open_closes_after_successes(self):
+        """Test half-open closes after half_open_requests successes."""
+        breaker = CircuitBreaker(failure_threshold=1, half_open_requests=2)
+        breaker._state = CircuitState.HALF_OPEN
+
+        await breaker.record_success()
+        assert breaker.state == CircuitState.HALF_OPEN
+
+        await breaker.record_success()
+        assert breaker.state == CircuitState.CLOSED
+
+    async def test_half_open_reopens_on_failure(self):
+        """Test a failure in half-open state reopens the circuit."""
+        breaker = CircuitBreaker()
+        breaker._state = CircuitState.HALF_OPEN
+
+        await breaker.record_failure()
+
+        assert breaker.state == CircuitState.OPEN
+
+    async def test_gauge_set_only_on_change(self):
+        """Test the state gauge is only written on actual transitions."""
+        breaker = CircuitBreaker()
+
+        with patch("app.services.circuit_breaker._CB_GAUGE_SET") as gauge_set:
+            breaker._set_state(CircuitState.CLOSED)
+            breaker._set_state(CircuitState.OPEN)
+            breaker._set_state(CircuitState.OPEN)
+
+        gauge_set.assert_called_once_with(CircuitState.OPEN.value)
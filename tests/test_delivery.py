@@ -3,10 +3,16 @@ Tests for delivery worker retry logic.
 """
 
 import pytest
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
 from unittest.mock import AsyncMock, patch, MagicMock
 
-from app.models.webhook import WebhookStatus, DeliveryAttempt, WebhookEvent
+from app.models.webhook import (
+    WebhookStatus,
+    DeliveryAttempt,
+    WebhookEvent,
+    WebhookEventInternal,
+)
 from app.config import get_settings
 
 
@@ -41,6 +47,37 @@ class TestExponentialBackoff:
         )
         assert delay == max_delay
 
+    def test_worker_backoff_table(self):
+        """Test the worker's precomputed delays match the backoff formula."""
+        from app.services.delivery_worker import DeliveryWorker
+
+        worker = DeliveryWorker()
+
+        assert [worker._backoff_delay(n) for n in range(1, 6)] == [1, 2, 4, 8, 16]
+        assert worker._backoff_delay(20) == get_settings().retry_max_delay
+
+
+class TestClaimLease:
+    """Test the claim lease covers in-flight deliveries."""
+
+    def test_lease_covers_batch_timeouts(self):
+        """Test the lease outlasts every wave of a batch timing out."""
+        import math
+        from app.services.delivery_worker import DeliveryWorker, _DELIVERY_TIMEOUT
+
+        settings = get_settings()
+        worker = DeliveryWorker()
+        waves = math.ceil(settings.worker_batch_size / settings.delivery_concurrency)
+        worst_case = waves * (
+            _DELIVERY_TIMEOUT.connect
+            + _DELIVERY_TIMEOUT.read
+            + _DELIVERY_TIMEOUT.write
+            + _DELIVERY_TIMEOUT.pool
+        )
+
+        assert worker._claim_lease > worst_case
+        assert worker._claim_lease >= settings.claim_lease_seconds
+
 
 class TestDeliveryAttempt:
     """Test DeliveryAttempt model."""
@@ -87,6 +124,17 @@ class TestDeliveryAttempt:
         assert attempt.status_code is None
         assert attempt.error_message == "Timeout"
 
+    def test_attempt_to_mongo(self):
+        """Test that the hand-built Mongo document matches model_dump."""
+        attempt = DeliveryAttempt(
+            attempt_number=1,
+            status_code=200,
+            success=True,
+            duration_ms=150.5,
+        )
+
+        assert attempt.to_mongo() == attempt.model_dump()
+
 
 class TestWebhookEvent:
     """Test WebhookEvent model."""
@@ -118,6 +166,14 @@ class TestWebhookEvent:
         assert "received_at" in doc
         assert "_id" not in doc  # ID is excluded
 
+    def test_payload_raw_stored_but_not_serialized(self):
+        """Test that the raw body is written to Mongo but hidden from the API."""
+        body = b'{"event": "test"}'
+        event = WebhookEvent(payload={"event": "test"}, payload_raw=body)
+
+        assert bytes(event.to_mongo()["payload_raw"]) == body
+        assert "payload_raw" not in event.model_dump()
+
     def test_event_from_mongo(self):
         """Test creating event from MongoDB document."""
         doc = {
@@ -135,3 +191,299 @@ class TestWebhookEvent:
         assert event.id == "507f1f77bcf86cd799439011"
         assert event.status == WebhookStatus.DELIVERED
         assert event.version == 2
+
+
+class TestSearchRequest:
+    """Test SearchRequest decoding."""
+
+    def test_decode_defaults(self):
+        """Test that an empty body decodes to the defaults."""
+        import msgspec
+        from app.models.webhook import SearchRequest
+
+        search = msgspec.json.decode(b"{}", type=SearchRequest)
+
+        assert search.status is None
+        assert search.skip == 0
+        assert search.limit == 20
+        assert search.include_aggregations is True
+
+    def test_decode_filters(self):
+        """Test decoding status and date filters."""
+        import msgspec
+        from app.models.webhook import SearchDate, SearchRequest
+
+        search = msgspec.json.decode(
+            b'{"status": "DELIVERED", "from_date": "2024-01-01T00:00:00Z"}',
+            type=SearchRequest,
+            dec_hook=SearchDate.dec_hook,
+        )
+
+        assert search.status == WebhookStatus.DELIVERED
+        assert search.from_date == datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def test_limit_bounds(self):
+        """Test that limit is validated."""
+        import msgspec
+        from app.models.webhook import SearchRequest
+
+        with pytest.raises(msgspec.ValidationError):
+            msgspec.json.decode(b'{"limit": 101}', type=SearchRequest)
+
+
+class TestWebhookEventInternal:
+    """Test the worker-side event struct."""
+
+    def test_from_mongo(self):
+        """Test decoding a MongoDB document without Pydantic."""
+        doc = {
+            "_id": ObjectId("507f1f77bcf86cd799439011"),
+            "payload": {"event": "test"},
+            "payload_raw": b'{"event": "test"}',
+            "status": "PROCESSING",
+            "received_at": datetime.now(timezone.utc),
+            "event_type": "test",
+            "delivery_attempts": [{"attempt_number": 1, "success": False}],
+            "claim_token": "abc",
+        }
+
+        event = WebhookEventInternal.from_mongo(doc)
+
+        assert event.id == ObjectId("507f1f77bcf86cd799439011")
+        assert event.status == WebhookStatus.PROCESSING
+        assert event.payload_raw == b'{"event": "test"}'
+        assert len(event.delivery_attempts) == 1
+
+    def test_claim_projection_skips_payload(self):
+        """Test claims load payload_raw but not the decoded payload."""
+        from app.services.delivery_worker import _CLAIM_PROJECTION
+
+        assert "payload_raw" in _CLAIM_PROJECTION
+        assert "payload" not in _CLAIM_PROJECTION
+
+    async def test_legacy_event_payload_fetched(self):
+        """Test events without payload_raw fetch the payload on delivery."""
+        from app.services.delivery_worker import DeliveryWorker
+
+        event = WebhookEventInternal(id=ObjectId())
+        db = MagicMock()
+        db.webhooks.find_one = AsyncMock(return_value={"payload": {"a": 1}})
+
+        with patch("app.services.delivery_worker.Database.get_db", return_value=db):
+            body = await DeliveryWorker._payload_bytes(event)
+
+        assert body == b'{"a":1}'
+        db.webhooks.find_one.assert_awaited_once_with({"_id": event.id}, {"payload": 1})
+
+
+class _AsyncCursor:
+    """Minimal async cursor stand-in for Motor's find()."""
+
+    def __init__(self, docs):
+        self._docs = docs
+
+    def limit(self, n):
+        return _AsyncCursor(self._docs[:n])
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self._docs:
+            yield doc
+
+
+class TestBatchClaim:
+    """Test batch claiming of pending events."""
+
+    @pytest.mark.asyncio
+    async def test_claim_batch_uses_single_update(self):
+        """Test that a batch is claimed with one update_many and loaded by token."""
+        from app.services.delivery_worker import DeliveryWorker
+
+        worker = DeliveryWorker()
+        claimed = [
+            {"_id": ObjectId("507f1f77bcf86cd799439011"), "payload": {"a": 1}},
+            {"_id": ObjectId("507f1f77bcf86cd799439012"), "payload": {"a": 2}},
+        ]
+
+        db = MagicMock()
+        db.webhooks.find.side_effect = [
+            _AsyncCursor([{"_id": d["_id"]} for d in claimed]),
+            _AsyncCursor(claimed),
+        ]
+        db.webhooks.update_many = AsyncMock()
+
+        events = await worker._claim_batch(db)
+
+        assert [e.id for e in events] == [d["_id"] for d in claimed]
+        db.webhooks.update_many.assert_awaited_once()
+
+        claim_filter, update = db.webhooks.update_many.call_args.args
+        assert claim_filter["_id"] == {"$in": [d["_id"] for d in claimed]}
+        assert "$or" in claim_filter
+        token = update["$set"]["claim_token"]
+        assert db.webhooks.find.call_args.args[0] == {"claim_token": token}
+
+    @pytest.mark.asyncio
+    async def test_claim_batch_empty(self):
+        """Test that no update is issued when nothing is ready."""
+        from app.services.delivery_worker import DeliveryWorker
+
+        worker = DeliveryWorker()
+        db = MagicMock()
+        db.webhooks.find.return_value = _AsyncCursor([])
+        db.webhooks.update_many = AsyncMock()
+
+        events = await worker._claim_batch(db)
+
+        assert events == []
+        db.webhooks.update_many.assert_not_awaited()
+
+
+class TestDueQueue:
+    """Test the Redis due queue helpers."""
+
+    @pytest.mark.asyncio
+    async def test_enqueue_scores_by_due_time(self):
+        """Test that events are scored by their due timestamp."""
+        from app.services.due_queue import DUE_QUEUE_KEY, enqueue_due
+
+        redis = AsyncMock()
+        due_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        await enqueue_due(redis, "507f1f77bcf86cd799439011", due_at)
+
+        redis.zadd.assert_awaited_once_with(
+            DUE_QUEUE_KEY, {"507f1f77bcf86cd799439011": due_at.timestamp()}
+        )
+
+    @pytest.mark.asyncio
+    async def test_pop_due_removes_returned_ids(self):
+        """Test that popped IDs are removed from the queue."""
+        from app.services.due_queue import DUE_QUEUE_KEY, pop_due
+
+        redis = AsyncMock()
+        redis.zrangebyscore.return_value = ["a", "b"]
+
+        event_ids = await pop_due(redis, limit=10)
+
+        assert event_ids == ["a", "b"]
+        redis.zrem.assert_awaited_once_with(DUE_QUEUE_KEY, "a", "b")
+
+    @pytest.mark.asyncio
+    async def test_pop_due_empty(self):
+        """Test that nothing is removed when no events are due."""
+        from app.services.due_queue import pop_due
+
+        redis = AsyncMock()
+        redis.zrangebyscore.return_value = []
+
+        assert await pop_due(redis, limit=10) == []
+        redis.zrem.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_wait_for_work_blocks_on_wake_key(self):
+        """Test that idle workers block on the wake list."""
+        from app.services.due_queue import WAKE_KEY, wait_for_work
+
+        redis = AsyncMock()
+        redis.blpop.return_value = (WAKE_KEY, "1")
+
+        assert await wait_for_work(redis, timeout=1.0) is True
+        redis.blpop.assert_awaited_once_with([WAKE_KEY], timeout=1.0)
+
+        redis.blpop.return_value = None
+        assert await wait_for_work(redis, timeout=1.0) is False
+
+    @pytest.mark.asyncio
+    async def test_drain_is_bounded_per_tick(self):
+        """Test that a queue that never empties does not starve the sweep."""
+        from app.services.delivery_worker import DeliveryWorker
+
+        worker = DeliveryWorker()
+        worker._running = True
+        pop = AsyncMock(return_value=[str(ObjectId())])
+
+        with patch("app.services.delivery_worker.pop_due", new=pop), \
+                patch("app.services.delivery_worker.Database"), \
+                patch.object(worker, "_claim_batch", new=AsyncMock(return_value=[])), \
+                patch.object(worker, "_deliver_batch", new=AsyncMock()):
+            queue_ok, drained = await worker._process_due_events()
+
+        assert (queue_ok, drained) == (True, False)
+        assert pop.await_count == worker.settings.due_queue_max_batches
+
+
+class TestDeliverEvent:
+    """Test a single delivery attempt."""
+
+    @pytest.mark.asyncio
+    async def test_attempt_times_share_one_clock_read(self):
+        """Test the attempt timestamp and delivered time come from one clock read."""
+        from app.services.delivery_worker import DeliveryWorker
+
+        worker = DeliveryWorker()
+        worker._http_client = MagicMock()
+        worker._http_client.post = AsyncMock(return_value=MagicMock(status_code=200))
+        event = WebhookEventInternal(id=ObjectId(), payload_raw=b"{}")
+
+        with patch.object(worker, "_mark_delivered", new=AsyncMock()) as mark, \
+                patch("app.services.delivery_worker.circuit_breaker") as breaker:
+            breaker.can_execute = AsyncMock(return_value=True)
+            breaker.record_success = AsyncMock()
+            await worker._deliver_event(event)
+
+        _, attempt, now = mark.await_args.args
+        assert attempt.success is True
+        elapsed = timedelta(milliseconds=attempt.duration_ms)
+        assert abs((now - attempt.timestamp) - elapsed) <= timedelta(microseconds=1)
+
+
+class TestConcurrentDelivery:
+    """Test bounded concurrent delivery of claimed batches."""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """Test that no more than delivery_concurrency deliveries run at once."""
+        import asyncio
+
+        from app.services.delivery_worker import DeliveryWorker
+
+        worker = DeliveryWorker()
+        worker._semaphore = asyncio.Semaphore(2)
+        in_flight = 0
+        peak = 0
+
+        async def fake_deliver(event):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+        events = [WebhookEventInternal(id=ObjectId(), payload={"n": n}) for n in range(6)]
+        with patch.object(worker, "_deliver_event", side_effect=fake_deliver) as deliver:
+            await worker._deliver_batch(events)
+
+        assert deliver.await_count == 6
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_failure_does_not_abort_batch(self):
+        """Test that one failing delivery does not cancel the others."""
+        from app.services.delivery_worker import DeliveryWorker
+
+        worker = DeliveryWorker()
+        delivered = []
+
+        async def fake_deliver(event):
+            if event.payload["n"] == 0:
+                raise RuntimeError("boom")
+            delivered.append(event.payload["n"])
+
+        events = [WebhookEventInternal(id=ObjectId(), payload={"n": n}) for n in range(3)]
+        with patch.object(worker, "_deliver_event", side_effect=fake_deliver):
+            await worker._deliver_batch(events)
+
+        assert sorted(delivered) == [1, 2]
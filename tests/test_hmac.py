@@ -3,13 +3,22 @@ Tests for HMAC signature validation.
 """
 
 import pytest
+from unittest.mock import MagicMock, patch
 from app.services.hmac_validator import (
     validate_signature,
+    validate_signature_streaming,
     generate_signature,
+    generate_signature_bytes,
     HMACValidationError,
 )
 
 
+async def _chunked(data: bytes, size: int):
+    """Yield data in fixed-size chunks, like request.stream()."""
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
 class TestHMACValidation:
     """Test HMAC signature validation."""
 
@@ -23,12 +32,12 @@ class TestHMACValidation:
         assert signature is not None
         assert len(signature) == 64  # SHA256 hex digest length
 
-    def test_validate_signature_success(self):
+    def test_validate_signature_success(self, sig_for):
         """Test successful signature validation."""
         payload = b'{"event": "test"}'
         secret = "test-secret-key"
 
-        signature = generate_signature(payload, secret)
+        signature = sig_for(payload, secret)
         result = validate_signature(payload, signature, secret)
 
         assert result is True
@@ -51,11 +60,38 @@ class TestHMACValidation:
 
         assert "Invalid signature" in str(exc_info.value)
 
-    def test_validate_signature_wrong_secret(self):
+    def test_validate_signature_odd_length_hex(self, sig_for):
+        """Test validation fails cleanly on a malformed hex signature."""
+        payload = b'{"event": "test"}'
+        signature = sig_for(payload, "secret")
+
+        with pytest.raises(HMACValidationError) as exc_info:
+            validate_signature(payload, signature[:-1], "secret")
+
+        assert "Invalid signature" in str(exc_info.value)
+
+    def test_validate_signature_buffer_types(self, sig_for):
+        """Test validation accepts bytearray and memoryview payloads."""
+        payload = b'{"event": "test"}'
+        signature = sig_for(payload, "secret")
+
+        assert validate_signature(bytearray(payload), signature, "secret") is True
+        assert validate_signature(memoryview(b"prefix" + payload)[6:], signature, "secret") is True
+
+    def test_generate_signature_bytes(self):
+        """Test raw signature bytes match the hex signature."""
+        payload = b'{"event": "test"}'
+
+        raw = generate_signature_bytes(payload, "secret")
+
+        assert len(raw) == 32
+        assert raw.hex() == generate_signature(payload, "secret")
+
+    def test_validate_signature_wrong_secret(self, sig_for):
         """Test validation fails with wrong secret."""
         payload = b'{"event": "test"}'
 
-        signature = generate_signature(payload, "correct-secret")
+        signature = sig_for(payload, "correct-secret")
 
         with pytest.raises(HMACValidationError):
             validate_signature(payload, signature, "wrong-secret")
@@ -77,3 +113,76 @@ class TestHMACValidation:
         sig2 = generate_signature(payload, "secret2")
 
         assert sig1 != sig2
+
+    def test_signature_matches_stdlib_hmac(self):
+        """Test that signatures match hmac.new for short and long keys."""
+        import hashlib
+        import hmac
+
+        payload = b'{"event": "test", "data": "hello"}'
+
+        for secret in ["k", "test-secret-key", "x" * 64, "y" * 200]:
+            expected = hmac.new(secret.encode("utf-8"), payload, hashlib.sha256).hexdigest()
+            assert generate_signature(payload, secret) == expected
+
+    def test_blake3_signature(self):
+        """Test keyed BLAKE3 signatures are deterministic and key-dependent."""
+        pytest.importorskip("blake3")
+        from app.services.hmac_validator import _blake3_keyed
+
+        payload = b'{"event": "test"}'
+
+        sig1 = _blake3_keyed(b"secret1", payload)
+        sig2 = _blake3_keyed(b"secret2", payload)
+
+        assert len(sig1) == 32
+        assert sig1 == _blake3_keyed(b"secret1", payload)
+        assert sig1 != sig2
+
+    async def test_validate_signature_streaming(self, sig_for):
+        """Test streaming validation returns the joined body."""
+        payload = b'{"event": "test", "data": "' + b"x" * 5000 + b'"}'
+        signature = sig_for(payload, "secret")
+
+        body = await validate_signature_streaming(_chunked(payload, 1024), signature, "secret")
+
+        assert body == payload
+
+    def test_streaming_mac_matches_stdlib_hmac(self):
+        """Test the incremental HMAC matches hmac.new for short and long keys."""
+        import hashlib
+        import hmac
+
+        from app.services.hmac_validator import _StreamingHMAC
+
+        payload = b'{"event": "test", "data": "' + b"x" * 3000 + b'"}'
+
+        for key in [b"k", b"x" * 64, b"y" * 200]:
+            mac = _StreamingHMAC(key)
+            for i in range(0, len(payload), 1000):
+                mac.update(payload[i:i + 1000])
+            assert mac.digest() == hmac.new(key, payload, hashlib.sha256).digest()
+
+    async def test_validate_signature_streaming_invalid(self, sig_for):
+        """Test streaming validation rejects a mismatched signature."""
+        payload = b'{"event": "test"}'
+        signature = sig_for(payload, "correct-secret")
+
+        with pytest.raises(HMACValidationError) as exc_info:
+            await validate_signature_streaming(_chunked(payload, 4), signature, "wrong-secret")
+
+        assert "Invalid signature" in str(exc_info.value)
+
+    def test_check_signature_algorithm_without_blake3(self):
+        """Test startup check fails when blake3 is configured but missing."""
+        from app.services import hmac_validator
+
+        settings = MagicMock(signature_algorithm="blake3")
+        hmac_validator._signer.cache_clear()
+        try:
+            with patch.object(hmac_validator, "blake3", None), \
+                    patch.object(hmac_validator, "get_settings", return_value=settings):
+                with pytest.raises(RuntimeError):
+                    hmac_validator.check_signature_algorithm()
+        finally:
+            hmac_validator._signer.cache_clear()
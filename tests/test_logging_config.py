@@ -0,0 +1,31 @@
+"""
+Tests for logging setup and shutdown.
+"""
+
+import logging
+import logging.handlers
+import sys
+
+from app.logging_config import setup_logging, shutdown_logging
+
+
+class TestShutdownLogging:
+    """Test the queue listener is torn down cleanly."""
+
+    def test_records_written_after_shutdown(self, capsys):
+        """Test records logged after shutdown still reach stdout."""
+        setup_logging()
+        shutdown_logging()
+
+        root = logging.getLogger()
+        assert not any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers)
+
+        # Point the restored handler at the captured stdout
+        for handler in root.handlers:
+            handler.setStream(sys.stdout)
+        logging.getLogger("test").warning("after_shutdown")
+
+        assert "after_shutdown" in capsys.readouterr().out
+
+        # Leave logging configured as app.main does at import
+        setup_logging()
@@ -0,0 +1,257 @@
+"""
+Tests for the webhook ingestion route.
+"""
+
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.database import Database
+from app.main import app
+from app.services.hmac_validator import generate_signature
+
+
+@pytest.fixture
+def db():
+    """Mocked MongoDB database."""
+    db = MagicMock()
+    db.webhooks.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
+    db.webhooks.find_one = AsyncMock(return_value=None)
+    return db
+
+
+@pytest.fixture
+def redis():
+    """Mocked Redis client with a working pipeline."""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[1, 1])
+    redis = MagicMock()
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+    return redis
+
+
+@pytest.fixture
+async def client(db, redis):
+    """HTTP client calling the app in-process with mocked storage."""
+    transport = httpx.ASGITransport(app=app)
+    with patch.object(Database, "db", db), patch.object(Database, "redis", redis):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
+
+def _headers(body: bytes, **extra: str) -> dict[str, str]:
+    """Request headers with a valid signature for body."""
+    return {"X-Signature": generate_signature(body), **extra}
+
+
+class TestIngest:
+    """Test POST /webhooks/ingest."""
+
+    async def test_ingest_success(self, client, db, redis):
+        """Test a signed event is stored and queued for delivery."""
+        body = b'{"event_type": "order.created", "order_id": 1}'
+
+        response = await client.post("/webhooks/ingest", content=body, headers=_headers(body))
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "RECEIVED"
+        doc = db.webhooks.insert_one.call_args[0][0]
+        assert doc["payload"] == {"event_type": "order.created", "order_id": 1}
+        assert bytes(doc["payload_raw"]) == body
+        pipe = redis.pipeline.return_value.__aenter__.return_value
+        pipe.zadd.assert_called_once()
+        pipe.lpush.assert_called_once()
+        pipe.execute.assert_awaited_once()
+
+    async def test_ingest_uses_cached_hmac_state(self, client):
+        """Test ingest verifies signatures from the cached keyed contexts."""
+        from app.services.hmac_validator import _keyed_contexts
+
+        body = b'{"event_type": "order.created"}'
+        await client.post("/webhooks/ingest", content=body, headers=_headers(body))
+        hits = _keyed_contexts.cache_info().hits
+
+        with patch("hmac.new", side_effect=AssertionError("per-request key setup")):
+            response = await client.post("/webhooks/ingest", content=body, headers=_headers(body))
+
+        assert response.status_code == 200
+        assert _keyed_contexts.cache_info().hits > hits
+
+    async def test_ingest_bad_signature(self, client, db):
+        """Test an invalid signature is rejected with 401."""
+        body = b'{"event_type": "order.created"}'
+
+        response = await client.post(
+            "/webhooks/ingest", content=body, headers={"X-Signature": "00" * 32}
+        )
+
+        assert response.status_code == 401
+        db.webhooks.insert_one.assert_not_called()
+
+    async def test_ingest_non_object_body(self, client, db):
+        """Test a JSON body that is not an object is rejected with 400."""
+        body = b'[1, 2, 3]'
+
+        response = await client.post("/webhooks/ingest", content=body, headers=_headers(body))
+
+        assert response.status_code == 400
+        db.webhooks.insert_one.assert_not_called()
+
+    async def test_ingest_duplicate_idempotency_key(self, client, db):
+        """Test a repeated idempotency key returns the original event."""
+        body = b'{"event_type": "order.created"}'
+        existing_id = ObjectId()
+        db.webhooks.insert_one.side_effect = DuplicateKeyError("duplicate key")
+        db.webhooks.find_one.return_value = {
+            "_id": existing_id,
+            "status": "DELIVERED",
+            "received_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        }
+
+        response = await client.post(
+            "/webhooks/ingest",
+            content=body,
+            headers=_headers(body, **{"X-Idempotency-Key": "key-1"}),
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["id"] == str(existing_id)
+        assert data["status"] == "DELIVERED"
+        assert data["message"] == "Webhook already received"
+        db.webhooks.find_one.assert_awaited_once_with({"idempotency_key": "key-1"})
+
+
+class _AggregateCursor:
+    """Stand-in for the cursor returned by Motor's aggregate()."""
+
+    def __init__(self, results):
+        self._results = results
+
+    async def to_list(self, length=None):
+        return self._results
+
+
+class TestSearch:
+    """Test POST /webhooks/search."""
+
+    async def test_raw_response_matches_validated(self, client, db):
+        """Test the default response equals the ?validate=true response."""
+        # A pending event stored before idempotency keys existed; MongoDB
+        # returns naive datetimes
+        doc = {
+            "_id": ObjectId(),
+            "payload": {"event_type": "order.created"},
+            "status": "RECEIVED",
+            "received_at": datetime(2024, 1, 1, 12, 30),
+            "event_type": "order.created",
+            "delivery_attempts": [],
+            "version": 1,
+        }
+        page = MagicMock()
+        page.sort.return_value = page.skip.return_value = page.limit.return_value = page
+        page.to_list = AsyncMock(side_effect=lambda length: [dict(doc)])
+        db.webhooks.find = MagicMock(return_value=page)
+        db.webhooks.aggregate = MagicMock(
+            side_effect=lambda pipeline: _AggregateCursor([{
+                "count": [{"n": 1}],
+                "by_status": [{"_id": "RECEIVED", "count": 1}],
+                "by_event_type": [{"_id": "order.created", "count": 1}],
+                "hourly_histogram": [{"_id": "2024-01-01T12:00:00Z", "count": 1}],
+            }])
+        )
+
+        raw = await client.post("/webhooks/search", content=b"{}")
+        validated = await client.post("/webhooks/search?validate=true", content=b"{}")
+
+        assert raw.status_code == validated.status_code == 200
+        assert raw.json() == validated.json()
+        assert raw.json()["events"][0]["delivered_at"] is None
+
+    async def test_search_without_aggregations_counts(self, client, db):
+        """Test a page without aggregations uses a top-k find and a count."""
+        page = MagicMock()
+        page.sort.return_value = page.skip.return_value = page.limit.return_value = page
+        page.to_list = AsyncMock(return_value=[])
+        db.webhooks.find = MagicMock(return_value=page)
+        db.webhooks.count_documents = AsyncMock(return_value=7)
+        db.webhooks.aggregate = MagicMock()
+
+        response = await client.post(
+            "/webhooks/search",
+            content=b'{"include_aggregations": false, "limit": 5}',
+        )
+
+        assert response.status_code == 200
+        assert response.json()["total"] == 7
+        page.sort.assert_called_once_with("received_at", -1)
+        page.limit.assert_called_once_with(5)
+        db.webhooks.aggregate.assert_not_called()
+
+
+class TestSearchRequestDecoding:
+    """Test decoding of the /webhooks/search request body."""
+
+    @staticmethod
+    def _request(body: bytes) -> MagicMock:
+        request = MagicMock()
+        request.body = AsyncMock(return_value=body)
+        return request
+
+    async def test_lax_inputs(self):
+        """Test the search route accepts the inputs Pydantic accepted."""
+        from app.routes.webhooks import _decode_search_request
+
+        for body, field, expected in [
+            (b'{"limit": "20"}', "limit", 20),
+            (b'{"from_date": 1704067200}', "from_date", datetime(2024, 1, 1, tzinfo=timezone.utc)),
+            (b'{"from_date": "1704067200000"}', "from_date", datetime(2024, 1, 1, tzinfo=timezone.utc)),
+            (b'{"from_date": "2024-01-01"}', "from_date", datetime(2024, 1, 1)),
+            (b'{"to_date": "2024-01-01T00:00:00Z"}', "to_date", datetime(2024, 1, 1, tzinfo=timezone.utc)),
+        ]:
+            search = await _decode_search_request(self._request(body))
+
+            assert getattr(search, field) == expected
+
+    async def test_error_shape(self):
+        """Test validation errors keep FastAPI's loc/msg/type list."""
+        from fastapi.exceptions import RequestValidationError
+        from app.routes.webhooks import _decode_search_request
+
+        with pytest.raises(RequestValidationError) as exc_info:
+            await _decode_search_request(self._request(b'{"limit": 0}'))
+
+        error = exc_info.value.errors()[0]
+        assert error["loc"] == ["body", "limit"]
+        assert error["type"] == "value_error"
+
+    async def test_error_reports_failing_field(self):
+        """Test a valid date-only field does not mask a later invalid field."""
+        from fastapi.exceptions import RequestValidationError
+        from app.routes.webhooks import _decode_search_request
+
+        with pytest.raises(RequestValidationError) as exc_info:
+            await _decode_search_request(
+                self._request(b'{"from_date": "2024-01-01", "limit": 0}')
+            )
+
+        assert exc_info.value.errors()[0]["loc"] == ["body", "limit"]
+
+    async def test_invalid_date_rejected(self, client):
+        """Test an unparseable date returns 422."""
+        response = await client.post("/webhooks/search", content=b'{"from_date": "soon"}')
+
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"] == ["body", "from_date"]
+
+    def test_openapi_documents_request_body(self):
+        """Test the msgspec-decoded body still appears in the OpenAPI schema."""
+        operation = app.openapi()["paths"]["/webhooks/search"]["post"]
+        schema = operation["requestBody"]["content"]["application/json"]["schema"]
+
+        assert set(schema["properties"]) >= {"status", "from_date", "limit"}
+        assert "$ref" not in str(schema)